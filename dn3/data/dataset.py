@@ -6,7 +6,7 @@ import tqdm
 import numpy as np
 
 from dn3.transforms.preprocessors import Preprocessor
-from dn3.transforms.instance import InstanceTransform, same_channel_sets
+from dn3.transforms.instance import InstanceTransform, same_channel_sets, compile_transform_pipelines
 from dn3.utils import rand_split, unfurl, DN3atasetNanFound, DN3atasetException
 
 from abc import ABC
@@ -113,6 +113,13 @@ class DN3ataset(TorchDataset):
         """
         self._transforms = list()
 
+    def compile_transforms(self):
+        """
+        Replace consecutive transforms of this dataset that support it with single compiled (TorchScript) pipelines.
+        See :any:`compile_transform_pipelines`. This should be done after all transforms have been added.
+        """
+        self._transforms = compile_transform_pipelines(self._transforms)
+
     def preprocess(self, preprocessor: Preprocessor, apply_transform=True):
         """
         Applies a preprocessor to the dataset
@@ -1,5 +1,7 @@
 import torch
 from torch import nn
+from torch.utils.checkpoint import checkpoint
+from contextlib import contextmanager
 
 
 class _SingleAxisOperation(nn.Module):
@@ -134,13 +136,46 @@ class DenseFilter(nn.Module):
             nn.Dropout2d(do)
         )
 
+    def new_features(self, *features):
+        return self.net(torch.cat(features, dim=1))
+
+    def checkpointed_new_features(self, *features):
+        """
+        Same as :py:meth:`new_features()`, but recomputed during the backward pass rather than keeping intermediate
+        results. Only the original (not the recomputed) forward pass updates the batch norm running statistics.
+        """
+        recomputing = False
+
+        def run(*inputs):
+            nonlocal recomputing
+            if recomputing:
+                with self._frozen_running_stats():
+                    return self.new_features(*inputs)
+            recomputing = True
+            return self.new_features(*inputs)
+
+        return checkpoint(run, *features, use_reentrant=False)
+
+    @contextmanager
+    def _frozen_running_stats(self):
+        norms = [m for m in self.net.modules() if isinstance(m, nn.modules.batchnorm._BatchNorm) and
+                 m.track_running_stats]
+        saved = [(m.running_mean.clone(), m.running_var.clone(), m.num_batches_tracked.clone()) for m in norms]
+        try:
+            yield
+        finally:
+            for m, (mean, var, num_batches) in zip(norms, saved):
+                m.running_mean.copy_(mean)
+                m.running_var.copy_(var)
+                m.num_batches_tracked.copy_(num_batches)
+
     def forward(self, x):
         return torch.cat((x, self.net(x)), dim=1)
 
 
 class DenseSpatialFilter(nn.Module):
     def __init__(self, channels, growth, depth, in_ch=1, bottleneck=4, dropout_rate=0.0, activation=nn.LeakyReLU,
-                 collapse=True):
+                 collapse=True, memory_efficient=False):
         """
         This extends the :any:`DenseFilter` to specifically operate in channel space and collapse this dimension
         over the course of `depth` layers.
@@ -155,8 +190,15 @@ class DenseSpatialFilter(nn.Module):
         dropout_rate
         activation
         collapse
+        memory_efficient : bool
+                           If `True`, rather than storing the (growing) concatenated input of every layer for the
+                           backward pass, only each layer's new features are kept and the layers are recomputed during
+                           the backward pass. This trades extra computation for activation memory that grows linearly
+                           rather than quadratically with `depth`. The outputs, gradients and batch norm
+                           statistics are the same as without it.
         """
         super().__init__()
+        self.memory_efficient = memory_efficient
         self.net = nn.Sequential(*[
             DenseFilter(in_ch + growth * d, growth, bottleneck=bottleneck, do=dropout_rate,
                         activation=activation) for d in range(depth)
@@ -169,7 +211,13 @@ class DenseSpatialFilter(nn.Module):
     def forward(self, x):
         if len(x.shape) < 4:
             x = x.unsqueeze(1).permute([0, 1, 3, 2])
-        x = self.net(x)
+        if self.memory_efficient and torch.is_grad_enabled():
+            features = [x]
+            for layer in self.net:
+                features.append(layer.checkpointed_new_features(*features))
+            x = torch.cat(features, dim=1)
+        else:
+            x = self.net(x)
         if self.collapse:
             return self.channel_collapse(x).squeeze(-2)
         return x
@@ -229,7 +229,7 @@ class TIDNet(Classifier):
 
     def __init__(self, targets, samples, channels, s_growth=24, t_filters=32, do=0.4, pooling=20,
                  activation=nn.LeakyReLU, temp_layers=2, spat_layers=2, temp_span=0.05, bottleneck=3,
-                 summary=-1, return_features=False):
+                 summary=-1, return_features=False, memory_efficient=False):
         self.temp_len = math.ceil(temp_span * samples)
         summary = samples // pooling if summary == -1 else summary
         self._num_features = (t_filters + s_growth * spat_layers) * summary
@@ -243,7 +243,8 @@ class TIDNet(Classifier):
         )
 
         self.spatial = DenseSpatialFilter(self.channels, s_growth, spat_layers, in_ch=t_filters, dropout_rate=do,
-                                          bottleneck=bottleneck, activation=activation)
+                                          bottleneck=bottleneck, activation=activation,
+                                          memory_efficient=memory_efficient)
         self.extract_features = nn.Sequential(
             nn.AdaptiveAvgPool1d(int(summary)),
         )
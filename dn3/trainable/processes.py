@@ -1,5 +1,9 @@
+import os
 import re
+import math
+import warnings
 from sys import gettrace
+from contextlib import ExitStack
 
 from dn3.data.dataset import DN3ataset
 from dn3.utils import LabelSmoothedCrossEntropyLoss
@@ -19,6 +23,143 @@ import numpy as np
 from pandas import DataFrame
 from collections import OrderedDict
 from torch.utils.data import DataLoader, WeightedRandomSampler
+from torch.utils.data.distributed import DistributedSampler
+from torch.nn.parallel import DistributedDataParallel
+
+
+# Older allocators refuse options they don't know, and expandable segments were only added in torch 2.1
+_CUDA_ALLOC_CONF = "expandable_segments:True,max_split_size_mb:128" if torch.__version__ >= "2.1" \
+    else "max_split_size_mb:128"
+
+
+def _is_distributed():
+    return torch.distributed.is_available() and torch.distributed.is_initialized()
+
+
+def _is_main_process():
+    return not _is_distributed() or torch.distributed.get_rank() == 0
+
+
+def _unwrap_module(module):
+    """Strip any compiled or distributed wrappers from a module, to get at the model that was originally provided."""
+    while True:
+        if isinstance(module, DistributedDataParallel):
+            module = module.module
+        elif hasattr(module, '_orig_mod'):
+            # Result of torch.compile()
+            module = module._orig_mod
+        else:
+            return module
+
+
+def _upcast(outputs):
+    """Cast reduced precision (e.g. mixed precision) outputs to single precision, which e.g. numpy supports."""
+    if isinstance(outputs, (tuple, list)):
+        return type(outputs)(_upcast(o) for o in outputs)
+    if isinstance(outputs, torch.Tensor) and outputs.dtype in (torch.float16, torch.bfloat16):
+        return outputs.float()
+    return outputs
+
+
+def _find_ddp(module):
+    """Find the :any:`DistributedDataParallel` wrapper of a (possibly compiled) module, or None if it has none."""
+    while True:
+        if isinstance(module, DistributedDataParallel):
+            return module
+        elif hasattr(module, '_orig_mod'):
+            module = module._orig_mod
+        else:
+            return None
+
+
+def _configure_cuda_allocator(cuda_alloc_conf):
+    if cuda_alloc_conf is None or "PYTORCH_CUDA_ALLOC_CONF" in os.environ:
+        return
+    # The allocator reads this once, when CUDA is initialized
+    if torch.cuda.is_initialized():
+        warnings.warn("CUDA was initialized before the allocator could be configured, so {} is not used. Set "
+                      "PYTORCH_CUDA_ALLOC_CONF before using CUDA to apply it.".format(cuda_alloc_conf))
+        return
+    os.environ["PYTORCH_CUDA_ALLOC_CONF"] = cuda_alloc_conf
+
+
+def init_distributed(backend=None, cuda_alloc_conf=_CUDA_ALLOC_CONF):
+    """
+    Initialize the default process group from the environment variables set by `torchrun` (or
+    `python -m torch.distributed.launch --use_env`), i.e. `RANK`, `LOCAL_RANK` and `WORLD_SIZE`. Any process created
+    after this will automatically wrap its trainable modules with :any:`DistributedDataParallel`.
+
+    Run the training script with e.g.: `torchrun --nproc_per_node=4 my_training_script.py`
+
+    Parameters
+    ----------
+    backend : str, None
+              The `torch.distributed` backend to use, if None (default) uses "nccl" if cuda is available, and "gloo"
+              otherwise.
+    cuda_alloc_conf : str, None
+                      Configuration for PyTorch's CUDA caching allocator, see :any:`BaseProcess`. This is applied here,
+                      as selecting the device of this process initializes CUDA.
+
+    Returns
+    -------
+    local_rank : int
+                 The rank of this process on the local node, this should be used to select the device that is used.
+    """
+    local_rank = int(os.environ.get('LOCAL_RANK', 0))
+    if backend is None:
+        backend = 'nccl' if torch.cuda.is_available() else 'gloo'
+    if torch.cuda.is_available():
+        _configure_cuda_allocator(cuda_alloc_conf)
+        torch.cuda.set_device(local_rank)
+    if not _is_distributed():
+        torch.distributed.init_process_group(backend=backend, init_method='env://')
+    return local_rank
+
+
+class DataPrefetcher(object):
+
+    def __init__(self, loader: DataLoader, device: torch.device):
+        """
+        Iterates over a `DataLoader`, issuing the host to device copy of the *next* batch on a separate CUDA stream so
+        that it overlaps with computation on the current one. The loader should pin its memory (`pin_memory=True`),
+        otherwise the copies cannot be asynchronous.
+
+        Parameters
+        ----------
+        loader : DataLoader
+                 The loader to iterate over.
+        device : torch.device
+                 The CUDA device the batches should be moved to.
+        """
+        self.device = device
+        self.stream = torch.cuda.Stream(device=device)
+        self.dl_iter = iter(loader)
+        self._next_batch = None
+        self.prefetch()
+
+    def prefetch(self):
+        try:
+            batch = next(self.dl_iter)
+        except StopIteration:
+            self._next_batch = None
+            return
+        with torch.cuda.stream(self.stream):
+            self._next_batch = [x.to(self.device, non_blocking=True) for x in batch]
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        if self._next_batch is None:
+            raise StopIteration
+        current_stream = torch.cuda.current_stream(self.device)
+        current_stream.wait_stream(self.stream)
+        batch = self._next_batch
+        for x in batch:
+            # Don't let the caching allocator reuse this memory while the current stream still needs it
+            x.record_stream(current_stream)
+        self.prefetch()
+        return batch
 
 
 class BaseProcess(object):
@@ -28,14 +169,20 @@ class BaseProcess(object):
 
     By default uses the SGD with momentum optimization.
     """
+    # Number of training batches between refreshing the reported metrics of the progress bar
+    PROGRESS_UPDATE_INTERVAL = 20
 
-    def __init__(self, lr=0.001, metrics=None, evaluation_only_metrics=None, l2_weight_decay=0.01, cuda=None, **kwargs):
+    def __init__(self, lr=0.001, metrics=None, evaluation_only_metrics=None, l2_weight_decay=0.01, cuda=None,
+                 use_amp=True, amp_dtype=torch.bfloat16, cuda_alloc_conf=_CUDA_ALLOC_CONF, **kwargs):
         """
         Initialization of the Base Trainable object. Any learning procedure that leverages DN3atasets should subclass
         this base class.
 
         By default uses the SGD with momentum optimization.
 
+        If a distributed process group has been initialized (see :any:`init_distributed`), the trainable modules are
+        wrapped with :any:`DistributedDataParallel` on the device of this process' local rank.
+
         Parameters
         ----------
         cuda : bool, string, None
@@ -54,9 +201,27 @@ class BaseProcess(object):
                           One of the simplest and most common regularizing techniques. If you find a model rapidly
                           reaching high training accuracy (and not validation) increase this. If having trouble fitting
                           the training data, decrease this.
+        use_amp : bool
+                  Whether to train with automatic mixed precision, this only has an effect when training on the GPU.
+        amp_dtype : torch.dtype
+                    The lower precision type used with mixed precision, either `torch.bfloat16` (default) or
+                    `torch.float16`. If the GPU does not support `bfloat16`, `float16` is used instead. Losses are
+                    dynamically scaled with `float16` to avoid underflowing gradients.
+        cuda_alloc_conf : str, None
+                          Configuration for PyTorch's CUDA caching allocator, used as `PYTORCH_CUDA_ALLOC_CONF` when
+                          training on the GPU. By default (with torch 2.1 or later), expandable segments are used to avoid
+                          fragmentation (and the resulting slow allocations) when trial lengths vary. This has no effect if the variable is
+                          already set or if `None`, and a warning is issued if CUDA was already initialized.
         kwargs : dict
                  Arguments that will be used by the processes' :py:meth:`BaseProcess.build_network()` method.
+
+        Notes
+        -----
+        On shared machines, `cuda_alloc_conf` can be combined with limiting how much of the GPU this process' caching
+        allocator may claim, e.g. `torch.cuda.set_per_process_memory_fraction(0.8)`.
         """
+        if cuda not in (False, 'cpu') and torch.cuda.is_available():
+            _configure_cuda_allocator(cuda_alloc_conf)
         if cuda is None:
             cuda = torch.cuda.is_available()
             if cuda:
@@ -64,6 +229,8 @@ class BaseProcess(object):
         if isinstance(cuda, bool):
             cuda = "cuda" if cuda else "cpu"
         assert isinstance(cuda, str)
+        if cuda == "cuda" and _is_distributed():
+            cuda = "cuda:{}".format(int(os.environ.get('LOCAL_RANK', 0)))
         self.cuda = cuda
         self.device = torch.device(cuda)
         self._eval_metrics = list() if evaluation_only_metrics is None else list(evaluation_only_metrics).copy()
@@ -84,6 +251,8 @@ class BaseProcess(object):
                 if not (isinstance(self.__dict__[member], torch.Tensor) and not self.__dict__[member].requires_grad):
                     self._trainables.append(member)
                 self.__dict__[member] = self.__dict__[member].to(self.device)
+        if _is_distributed():
+            self._wrap_distributed()
 
         self.optimizer = torch.optim.SGD(self.parameters(), weight_decay=l2_weight_decay, lr=lr, nesterov=True,
                                          momentum=0.9)
@@ -92,10 +261,51 @@ class BaseProcess(object):
         self.epoch = None
         self.lr = lr
         self.weight_decay = l2_weight_decay
+        self._accumulation_steps = 1
+        self._accumulated_batches = 0
+
+        self.use_amp = use_amp and self.device.type == 'cuda'
+        if self.use_amp and amp_dtype is torch.bfloat16 and not torch.cuda.is_bf16_supported():
+            amp_dtype = torch.float16
+        self.amp_dtype = amp_dtype
+        scale_loss = self.use_amp and amp_dtype is torch.float16
+        if hasattr(torch.amp, 'GradScaler'):
+            self.scaler = torch.amp.GradScaler('cuda', enabled=scale_loss)
+        else:
+            self.scaler = torch.cuda.amp.GradScaler(enabled=scale_loss)
 
         self._batch_transforms = list()
         self._eval_transforms = list()
 
+    def _wrap_distributed(self, bucket_cap_mb=25):
+        device_ids = [self.device.index] if self.device.type == 'cuda' else None
+        for member in self._trainables:
+            module = self.__dict__[member]
+            if isinstance(module, torch.Tensor):
+                # DDP can't wrap plain tensors, start every replica from the same values, see _sync_tensor_gradients()
+                torch.distributed.broadcast(module.data, src=0)
+                continue
+            if _find_ddp(module) is not None:
+                continue
+            # DDP refuses modules that have nothing to synchronize
+            if not any(p.requires_grad for p in module.parameters()):
+                continue
+            self.__dict__[member] = DistributedDataParallel(module, device_ids=device_ids,
+                                                            bucket_cap_mb=bucket_cap_mb,
+                                                            gradient_as_bucket_view=True)
+
+    def _sync_tensor_gradients(self):
+        """
+        Average the gradients of trainable tensors across the distributed processes. Unlike modules, these are not
+        wrapped with :any:`DistributedDataParallel`, so without this their replicas would drift apart.
+        """
+        world_size = torch.distributed.get_world_size()
+        for member in self._trainables:
+            tensor = self.__dict__[member]
+            if isinstance(tensor, torch.Tensor) and tensor.grad is not None:
+                torch.distributed.all_reduce(tensor.grad)
+                tensor.grad.div_(world_size)
+
     def set_optimizer(self, optimizer):
         assert isinstance(optimizer, torch.optim.Optimizer)
         del self.optimizer
@@ -134,7 +344,7 @@ class BaseProcess(object):
             self._eval_metrics += list(metrics.keys())
 
     def _optimize_dataloader_kwargs(self, num_worker_cap=6, **loader_kwargs):
-        loader_kwargs.setdefault('pin_memory', self.cuda == 'cuda')
+        loader_kwargs.setdefault('pin_memory', self.device.type == 'cuda')
         # Use multiple worker processes when NOT DEBUGGING
         if gettrace() is None:
             try:
@@ -155,8 +365,36 @@ class BaseProcess(object):
         print("Loading data with {} additional workers".format(loader_kwargs['num_workers']))
         return loader_kwargs
 
+    @staticmethod
+    def _training_dataloader_kwargs(**loader_kwargs):
+        # Only the training loader is reused between epochs, evaluation loaders are rebuilt for every evaluation
+        if loader_kwargs.get('num_workers', 0) > 0:
+            # Keep workers (and their transforms) alive between epochs, and have them prepare batches well ahead
+            loader_kwargs.setdefault('persistent_workers', True)
+            loader_kwargs.setdefault('prefetch_factor', 4)
+        return loader_kwargs
+
+    def _check_dataloader(self, loader: DataLoader):
+        if loader.num_workers == 0 or not _is_main_process():
+            return
+        suggestions = list()
+        if self.device.type == 'cuda' and not loader.pin_memory:
+            suggestions.append('pin_memory=True')
+        if not getattr(loader, 'persistent_workers', True):
+            suggestions.append('persistent_workers=True')
+        if loader.prefetch_factor is not None and loader.prefetch_factor < 4:
+            suggestions.append('prefetch_factor=4')
+        if len(suggestions) > 0:
+            warnings.warn("Provided training DataLoader could load faster with: {}".format(', '.join(suggestions)))
+
+    def _make_iterator(self, loader: DataLoader):
+        if self.device.type == 'cuda' and loader.pin_memory:
+            return DataPrefetcher(loader, self.device)
+        return iter(loader)
+
     def _get_batch(self, iterator):
-        batch = [x.to(self.device, non_blocking=self.cuda == 'cuda') for x in next(iterator)]
+        # Already on the device if prefetched
+        batch = [x.to(self.device, non_blocking=self.device.type == 'cuda') for x in next(iterator)]
         xforms = self._batch_transforms if self._training else self._eval_transforms
         for xform in xforms:
             if xform.only_trial_data:
@@ -258,8 +496,23 @@ class BaseProcess(object):
         return metrics
 
     def backward(self, loss):
-        self.optimizer.zero_grad()
-        loss.backward()
+        # Only clear gradients at the start of a (possibly accumulated) optimization step
+        if self._accumulated_batches <= 1:
+            self.optimizer.zero_grad(set_to_none=True)
+        self.scaler.scale(loss).backward()
+
+    def _gradient_sync(self, sync=True):
+        """
+        Context in which forward and backward passes are run, skips the gradient all-reduce of distributed modules if
+        `sync` is `False`. Both the forward and backward pass need to happen in this context.
+        """
+        stack = ExitStack()
+        if not sync:
+            for member in self._trainables:
+                ddp = _find_ddp(self.__dict__[member])
+                if ddp is not None:
+                    stack.enter_context(ddp.no_sync())
+        return stack
 
     def train(self, mode=True):
         self._training = mode
@@ -268,15 +521,25 @@ class BaseProcess(object):
 
     def train_step(self, *inputs):
         self.train(True)
-        outputs = self.forward(*inputs)
-        loss = self.calculate_loss(inputs, outputs)
-        self.backward(loss)
-
-        self.optimizer.step()
-        if self.scheduler is not None and self.scheduler_after_batch:
-            self.scheduler.step()
+        self._accumulated_batches += 1
+        optimizer_step = self._accumulated_batches >= self._accumulation_steps
+        with self._gradient_sync(optimizer_step):
+            with torch.autocast(device_type='cuda', dtype=self.amp_dtype, enabled=self.use_amp):
+                outputs = self.forward(*inputs)
+                loss = self.calculate_loss(inputs, outputs)
+            self.backward(loss / self._accumulation_steps if self._accumulation_steps > 1 else loss)
+
+        if optimizer_step:
+            if _is_distributed():
+                self._sync_tensor_gradients()
+            self.scaler.step(self.optimizer)
+            self.scaler.update()
+            self._accumulated_batches = 0
+            if self.scheduler is not None and self.scheduler_after_batch:
+                self.scheduler.step()
 
-        train_metrics = self.calculate_metrics(inputs, outputs)
+        # Metrics may not support the reduced precision of mixed precision outputs (numpy has no bfloat16)
+        train_metrics = self.calculate_metrics(inputs, _upcast(outputs))
         train_metrics.setdefault('loss', loss.item())
 
         return train_metrics
@@ -325,10 +588,11 @@ class BaseProcess(object):
         """
         self.train(False)
         loader_kwargs.setdefault('batch_size', 1)
+        loader_kwargs.setdefault('pin_memory', self.device.type == 'cuda')
         dataset = self._make_dataloader(dataset, **loader_kwargs)
 
-        pbar = tqdm.trange(len(dataset), desc="Predicting")
-        data_iterator = iter(dataset)
+        pbar = tqdm.trange(len(dataset), desc="Predicting", disable=not _is_main_process())
+        data_iterator = self._make_iterator(dataset)
 
         inputs = list()
         outputs = list()
@@ -354,6 +618,8 @@ class BaseProcess(object):
 
     @classmethod
     def standard_logging(cls, metrics: dict, start_message="End of Epoch"):
+        if not _is_main_process():
+            return
         if start_message.rstrip()[-1] != '|':
             start_message = start_message.rstrip() + " |"
         for m in metrics:
@@ -374,7 +640,8 @@ class BaseProcess(object):
         best : Any
                Whatever format is needed for :py:meth:`load_best()`, will be the argument provided to it.
         """
-        return [{k: v.cpu() for k, v in self.__dict__[m].state_dict().items()} for m in self._trainables]
+        return [{k: v.cpu() for k, v in _unwrap_module(self.__dict__[m]).state_dict().items()}
+                for m in self._trainables]
 
     def load_best(self, best):
         """
@@ -385,7 +652,7 @@ class BaseProcess(object):
         best: Any
         """
         for m, state_dict in zip(self._trainables, best):
-            self.__dict__[m].load_state_dict({k: v.to(self.device) for k, v in state_dict.items()})
+            _unwrap_module(self.__dict__[m]).load_state_dict({k: v.to(self.device) for k, v in state_dict.items()})
 
     def _retain_best(self, old_checkpoint, metrics_to_check: dict, retain_string: str):
         if retain_string is None:
@@ -413,6 +680,21 @@ class BaseProcess(object):
         # Only shuffle and drop last when training
         loader_kwargs.setdefault('shuffle', training)
         loader_kwargs.setdefault('drop_last', training)
+        # Shuffling is left to the sampler if there is one
+        if loader_kwargs.get('sampler', None) is not None:
+            loader_kwargs['shuffle'] = None
+
+        return loader_kwargs
+
+    @staticmethod
+    def _distributed_dataloader_args(dataset, **loader_kwargs):
+        # Split the training data between the processes, any other sampler is sharded rather than replaced
+        sampler = loader_kwargs.get('sampler', None)
+        if sampler is None:
+            loader_kwargs['sampler'] = DistributedSampler(dataset, shuffle=bool(loader_kwargs.get('shuffle', True)))
+        elif not isinstance(sampler, DistributedSampler):
+            loader_kwargs['sampler'] = DistributedSamplerWrapper(sampler)
+        loader_kwargs['shuffle'] = None
 
         return loader_kwargs
 
@@ -421,12 +703,16 @@ class BaseProcess(object):
         if isinstance(dataset, DataLoader):
             return dataset
 
-        return DataLoader(dataset, **self._dataloader_args(dataset, training, **loader_kwargs))
+        loader_kwargs = self._dataloader_args(dataset, training, **loader_kwargs)
+        if training and _is_distributed():
+            loader_kwargs = self._distributed_dataloader_args(dataset, **loader_kwargs)
+
+        return DataLoader(dataset, **loader_kwargs)
 
     def fit(self, training_dataset, epochs=1, validation_dataset=None, step_callback=None,
             resume_epoch=None, resume_iteration=None, log_callback=None,
             epoch_callback=None, batch_size=8, warmup_frac=0.2, retain_best='loss',
-            validation_interval=None, train_log_interval=None, **loader_kwargs):
+            validation_interval=None, train_log_interval=None, accumulation_steps=1, **loader_kwargs):
         """
         sklearn/keras-like convenience method to simply proceed with training across multiple epochs of the provided
         dataset
@@ -466,6 +752,12 @@ class BaseProcess(object):
         train_log_interval: int, None
                       The number of batches between persistent logging of training metrics, if None (default) happens
                       at the end of every epoch.
+        accumulation_steps: int
+                            The number of batches to accumulate gradients over before each optimizer step, the
+                            effective batch size is `batch_size * accumulation_steps`. The optimizer also steps after
+                            the last batch of every epoch, so groups of batches never span epochs. When training
+                            distributed, gradients are only synchronized between processes on the batches where the
+                            optimizer steps.
         loader_kwargs :
                       Any remaining keyword arguments will be passed as such to any DataLoaders that are automatically
                       constructed. If both training and validation datasets are provided as `DataLoaders`, this will be
@@ -478,6 +770,17 @@ class BaseProcess(object):
         rapid CUDA transfer if leveraging the GPU. Unless you are very comfortable with PyTorch, it's probably better
         to not provide your own DataLoader, and let this be done automatically.
 
+        With worker processes, an automatically constructed training loader also keeps its workers alive between
+        epochs and prefetches four batches per worker. A provided `DataLoader` is used as is, but a warning is issued
+        if it does not pin memory (when using the GPU), keep persistent workers or prefetch at least four batches. A
+        reasonable number of workers for a provided loader is `min(number of cpus, batch_size)`.
+
+        When training in a distributed process group, a :any:`DistributedSampler` is used to split the training
+        dataset between processes, any other sampler (e.g. for balancing) is split using
+        :any:`DistributedSamplerWrapper`. If providing your own `DataLoader`, it should make use of such a sampler
+        itself.
+        Only the process of rank 0 reports progress.
+
         Returns
         -------
         train_log : Dataframe
@@ -487,7 +790,11 @@ class BaseProcess(object):
         """
         loader_kwargs.setdefault('batch_size', batch_size)
         loader_kwargs = self._optimize_dataloader_kwargs(**loader_kwargs)
-        training_dataset = self._make_dataloader(training_dataset, training=True, **loader_kwargs)
+        if isinstance(training_dataset, DataLoader):
+            self._check_dataloader(training_dataset)
+        else:
+            training_dataset = self._make_dataloader(training_dataset, training=True,
+                                                     **self._training_dataloader_kwargs(**loader_kwargs))
 
         if resume_epoch is None:
             if resume_iteration is None or resume_iteration < len(training_dataset):
@@ -496,13 +803,19 @@ class BaseProcess(object):
                 resume_epoch = resume_iteration // len(training_dataset)
         resume_iteration = 1 if resume_iteration is None else resume_iteration % len(training_dataset)
 
+        assert accumulation_steps >= 1
+        self._accumulation_steps = int(accumulation_steps)
+        self._accumulated_batches = 0
+        steps_per_epoch = math.ceil(len(training_dataset) / self._accumulation_steps)
+
         _clear_scheduler_after = self.scheduler is None
         if _clear_scheduler_after:
-            last_epoch_workaround = len(training_dataset) * (resume_epoch - 1) + resume_iteration
+            last_epoch_workaround = steps_per_epoch * (resume_epoch - 1) + resume_iteration // \
+                                    self._accumulation_steps
             last_epoch_workaround = -1 if last_epoch_workaround <= 1 else last_epoch_workaround
             self.set_scheduler(
                 torch.optim.lr_scheduler.OneCycleLR(self.optimizer, self.lr, epochs=epochs,
-                                                    steps_per_epoch=len(training_dataset),
+                                                    steps_per_epoch=steps_per_epoch,
                                                     pct_start=warmup_frac,
                                                     last_epoch=last_epoch_workaround)
             )
@@ -541,20 +854,28 @@ class BaseProcess(object):
             validation_log.append(_metrics)
             return _metrics
 
-        epoch_bar = tqdm.trange(resume_epoch, epochs + 1, desc="Epoch", unit='epoch', initial=resume_epoch, total=epochs)
+        epoch_bar = tqdm.trange(resume_epoch, epochs + 1, desc="Epoch", unit='epoch', initial=resume_epoch, total=epochs,
+                                disable=not _is_main_process())
         for epoch in epoch_bar:
             self.epoch = epoch
+            if hasattr(training_dataset.sampler, 'set_epoch'):
+                training_dataset.sampler.set_epoch(epoch)
             pbar = tqdm.trange(resume_iteration, len(training_dataset) + 1, desc="Iteration", unit='batches',
-                               initial=resume_iteration, total=len(training_dataset))
-            data_iterator = iter(training_dataset)
+                               initial=resume_iteration, total=len(training_dataset), disable=not _is_main_process())
+            data_iterator = self._make_iterator(training_dataset)
+            self._accumulated_batches = 0
             for iteration in pbar:
+                if self._accumulated_batches == 0:
+                    # Shorten the last window so that every epoch ends with an optimizer step
+                    self._accumulation_steps = min(int(accumulation_steps), pbar.total - iteration + 1)
                 inputs = self._get_batch(data_iterator)
                 train_metrics = self.train_step(*inputs)
                 train_metrics['lr'] = self.optimizer.param_groups[0]['lr']
                 if 'momentum' in self.optimizer.defaults:
                     train_metrics['momentum'] = self.optimizer.param_groups[0]['momentum']
                 update_metrics(train_metrics, iteration+1)
-                pbar.set_postfix(metrics)
+                if iteration % self.PROGRESS_UPDATE_INTERVAL == 0 or iteration == pbar.total:
+                    pbar.set_postfix(metrics)
                 train_metrics['epoch'] = epoch
                 train_metrics['iteration'] = iteration
                 train_log.append(train_metrics)
@@ -598,6 +919,8 @@ class BaseProcess(object):
         if _clear_scheduler_after:
             self.set_scheduler(None)
         self.epoch = None
+        self._accumulation_steps = 1
+        self._accumulated_batches = 0
 
         if retain_best is not None and validation_dataset is not None:
             tqdm.tqdm.write("Loading best model...")
@@ -609,7 +932,16 @@ class BaseProcess(object):
 class StandardClassification(BaseProcess):
 
     def __init__(self, classifier: torch.nn.Module, loss_fn=None, cuda=None, metrics=None, learning_rate=0.01,
-                 label_smoothing=None, **kwargs):
+                 label_smoothing=None, compile_classifier=True, **kwargs):
+        """
+        Parameters
+        ----------
+        compile_classifier : bool
+                             Whether to compile the classifier with `torch.compile()` (if it is available) when the
+                             process runs on the GPU. Compilation takes some time before the first batch, so consider
+                             disabling this for short debugging or evaluation runs. Checkpoints are always taken from
+                             the uncompiled classifier.
+        """
         if isinstance(metrics, dict):
             metrics.setdefault('Accuracy', self._simple_accuracy)
         else:
@@ -617,13 +949,15 @@ class StandardClassification(BaseProcess):
         super(StandardClassification, self).__init__(cuda=cuda, lr=learning_rate, classifier=classifier,
                                                      metrics=metrics, **kwargs)
         if label_smoothing is not None and isinstance(label_smoothing, float) and (0 < label_smoothing < 1):
-            self.loss = LabelSmoothedCrossEntropyLoss(self.classifier.targets, smoothing=label_smoothing).\
-                to(self.device)
+            targets = _unwrap_module(self.classifier).targets
+            self.loss = LabelSmoothedCrossEntropyLoss(targets, smoothing=label_smoothing).to(self.device)
         elif loss_fn is None:
             self.loss = torch.nn.CrossEntropyLoss().to(self.device)
         else:
             self.loss = loss_fn.to(self.device)
         self.best_metric = None
+        if compile_classifier and getattr(torch, 'compile', None) is not None and self.device.type == 'cuda':
+            self.classifier = torch.compile(self.classifier, mode="max-autotune", fullgraph=False)
 
     @staticmethod
     def _simple_accuracy(inputs, outputs):
@@ -635,7 +969,8 @@ class StandardClassification(BaseProcess):
         return (inputs[-1] == outputs.argmax(dim=-1)).float().mean().item()
 
     def forward(self, *inputs):
-        if isinstance(self.classifier, Classifier) and self.classifier.return_features:
+        classifier = _unwrap_module(self.classifier)
+        if isinstance(classifier, Classifier) and classifier.return_features:
             prediction, _ = self.classifier(*inputs[:-1])
         else:
             prediction = self.classifier(*inputs[:-1])
@@ -654,7 +989,8 @@ class StandardClassification(BaseProcess):
         return super(StandardClassification, self).calculate_loss(inputs, outputs)
 
     def fit(self, training_dataset, epochs=1, validation_dataset=None, step_callback=None, epoch_callback=None,
-            batch_size=8, warmup_frac=0.2, retain_best='loss', balance_method=None, **loader_kwargs):
+            batch_size=8, warmup_frac=0.2, retain_best='loss', balance_method=None, accumulation_steps=1,
+            **loader_kwargs):
         """
         sklearn/keras-like convenience method to simply proceed with training across multiple epochs of the provided
         dataset
@@ -683,6 +1019,8 @@ class StandardClassification(BaseProcess):
                          sample all training samples equally. 'undersample' will sample each class N_min times
                          where N_min is equal to the number of examples in the minority class. 'oversample' will sample
                          each class N_max times, where N_max is the number of the majority class.
+        accumulation_steps : int
+                             The number of batches to accumulate gradients over before each optimizer step.
         loader_kwargs :
                       Any remaining keyword arguments will be passed as such to any DataLoaders that are automatically
                       constructed. If both training and validation datasets are provided as `DataLoaders`, this will be
@@ -707,6 +1045,7 @@ class StandardClassification(BaseProcess):
                                                        warmup_frac=warmup_frac, retain_best=retain_best,
                                                        validation_dataset=validation_dataset,
                                                        balance_method=balance_method,
+                                                       accumulation_steps=accumulation_steps,
                                                        **loader_kwargs)
 
     BALANCE_METHODS = ['undersample', 'oversample', 'ldam']
@@ -733,6 +1072,9 @@ class StandardClassification(BaseProcess):
             else:
                 self.loss = create_ldam_loss(dataset)
 
+        if training and _is_distributed():
+            loader_kwargs = self._distributed_dataloader_args(dataset, **loader_kwargs)
+
         if loader_kwargs.get('sampler', None) is not None:
             loader_kwargs['shuffle'] = None
 
@@ -779,6 +1121,47 @@ def balanced_oversampling(dataset, replacement=True):
     return WeightedRandomSampler(sample_weights, len(counts) * int(counts.max()), replacement=replacement)
 
 
+class DistributedSamplerWrapper(DistributedSampler):
+
+    def __init__(self, sampler, num_replicas=None, rank=None, seed=0, drop_last=False):
+        """
+        Splits the indices drawn by another sampler (e.g. the :any:`WeightedRandomSampler` used for balancing) between
+        the processes of a distributed group, the way a :any:`DistributedSampler` splits a dataset. Every epoch, all
+        processes first draw the same indices, by seeding the sampler's `generator` (if it has one) with the epoch
+        set using `set_epoch()`.
+
+        Parameters
+        ----------
+        sampler : Sampler
+                  The sampler to split, it must have a length.
+        num_replicas : int, None
+                       The number of processes, by default the size of the default process group.
+        rank : int, None
+               The rank of this process, by default fetched from the default process group.
+        seed : int
+               The seed that the epoch is added to, this should be the same for all processes.
+        drop_last : bool
+                    Whether to drop the last indices so that they are evenly split, rather than repeating indices.
+        """
+        super().__init__(range(len(sampler)), num_replicas=num_replicas, rank=rank, shuffle=False, seed=seed,
+                         drop_last=drop_last)
+        self.sampler = sampler
+
+    def __iter__(self):
+        if hasattr(self.sampler, 'generator'):
+            generator = torch.Generator()
+            generator.manual_seed(self.seed + self.epoch)
+            self.sampler.generator = generator
+        indices = list(self.sampler)
+        if self.drop_last:
+            indices = indices[:self.total_size]
+        else:
+            padding = self.total_size - len(indices)
+            indices += (indices * math.ceil(padding / len(indices)))[:padding]
+
+        return iter(indices[self.rank:self.total_size:self.num_replicas])
+
+
 class LDAMLoss(torch.nn.Module):
     # September 2020 - Originally taken from: https://github.com/kaidic/LDAM-DRW/blob/master/losses.py
     # October   2020 - Modified to support non-cuda devices and a switch to activate drw
@@ -115,7 +115,9 @@ class ZScore(InstanceTransform):
     Z-score normalization of trials
     """
     def __call__(self, x):
-        return (x - x.mean()) / x.std()
+        # Mean and std in a single reduction, then only allocates once, leaving the original trial untouched
+        std, mean = torch.std_mean(x)
+        return x.sub(mean).div_(std)
 
 
 class FixedScale(InstanceTransform):
@@ -153,15 +155,129 @@ class TemporalPadding(InstanceTransform):
         self.end_padding = end_padding
         self.mode = mode
         self.constant_value = constant_value
+        # Only the last (temporal) dimension is padded, so this is the same regardless of the trial's shape
+        self._pad = (start_padding, end_padding)
 
     def __call__(self, x):
-        pad = [self.start_padding, self.end_padding] + [0 for _ in range(2, x.shape[-1])]
-        return torch.nn.functional.pad(x, pad, mode=self.mode, value=self.constant_value)
+        return torch.nn.functional.pad(x, self._pad, mode=self.mode, value=self.constant_value)
 
     def new_sequence_length(self, old_sequence_length):
         return old_sequence_length + self.start_padding + self.end_padding
 
 
+class _ScriptedZScore(torch.nn.Module):
+
+    def __init__(self, transform: ZScore):
+        super().__init__()
+
+    def forward(self, x):
+        std, mean = torch.std_mean(x)
+        return (x - mean) / std
+
+
+class _ScriptedTemporalPadding(torch.nn.Module):
+
+    def __init__(self, transform: TemporalPadding):
+        super().__init__()
+        self.pad = list(transform._pad)
+        self.mode = str(transform.mode)
+        self.value = float(transform.constant_value)
+
+    def forward(self, x):
+        return torch.nn.functional.pad(x, self.pad, mode=self.mode, value=self.value)
+
+
+class CompiledTransformPipeline(InstanceTransform):
+
+    SUPPORTED = {ZScore: _ScriptedZScore, TemporalPadding: _ScriptedTemporalPadding}
+
+    def __init__(self, transforms: list):
+        """
+        Executes a sequence of trial transforms as a single TorchScript graph, rather than one (eager) python call
+        after another. Only the (exact) transform types in `SUPPORTED` can be compiled, see
+        :any:`compile_transform_pipelines` to collapse those that can in a longer list of transforms.
+
+        The graph is scripted when first called, so that the pipeline can be copied or sent to data loading worker
+        processes beforehand.
+
+        Parameters
+        ----------
+        transforms : List[InstanceTransform]
+                     The transforms to execute, in order.
+        """
+        super().__init__()
+        for xform in transforms:
+            if type(xform) not in self.SUPPORTED:
+                raise ValueError("{} can not be compiled.".format(xform))
+        self.transforms = list(transforms)
+        self._scripted = None
+
+    def __str__(self):
+        return "{}({})".format(self.__class__.__name__, ", ".join(str(x) for x in self.transforms))
+
+    def __getstate__(self):
+        # Scripted modules do not pickle, they are recompiled as needed instead
+        state = self.__dict__.copy()
+        state['_scripted'] = None
+        return state
+
+    def __call__(self, x):
+        if self._scripted is None:
+            self._scripted = torch.jit.script(torch.nn.Sequential(
+                *[self.SUPPORTED[type(xform)](xform) for xform in self.transforms]
+            ))
+        return self._scripted(x)
+
+    def new_channels(self, old_channels):
+        for xform in self.transforms:
+            old_channels = xform.new_channels(old_channels)
+        return old_channels
+
+    def new_sfreq(self, old_sfreq):
+        for xform in self.transforms:
+            old_sfreq = xform.new_sfreq(old_sfreq)
+        return old_sfreq
+
+    def new_sequence_length(self, old_sequence_length):
+        for xform in self.transforms:
+            old_sequence_length = xform.new_sequence_length(old_sequence_length)
+        return old_sequence_length
+
+
+def compile_transform_pipelines(transforms: list):
+    """
+    Collapse each run of (two or more) consecutive transforms that can be compiled into a single
+    :any:`CompiledTransformPipeline`. All other transforms are left as they are.
+
+    Parameters
+    ----------
+    transforms : List[InstanceTransform]
+
+    Returns
+    -------
+    transforms : List[InstanceTransform]
+                 Transforms that behave equivalently, in the same order.
+    """
+    compiled = list()
+    run = list()
+
+    def end_run():
+        if len(run) > 1:
+            compiled.append(CompiledTransformPipeline(run))
+        else:
+            compiled.extend(run)
+
+    for xform in transforms:
+        if type(xform) in CompiledTransformPipeline.SUPPORTED:
+            run.append(xform)
+        else:
+            end_run()
+            run = list()
+            compiled.append(xform)
+    end_run()
+    return compiled
+
+
 class TemporalInterpolation(InstanceTransform):
 
     def __init__(self, desired_sequence_length, mode='nearest', new_sfreq=None):
@@ -303,13 +419,20 @@ class CropAndResample(TemporalInterpolation):
             return super(CropAndResample, self).__call__(x[:, offset:])
 
 
-class MappingDeep1010(InstanceTransform):
+class MappingDeep1010(InstanceTransform, torch.nn.Module):
     """
     Maps various channel sets into the Deep10-10 scheme, and normalizes data between [-1, 1] with an additional scaling
     parameter to describe the relative scale of a trial with respect to the entire dataset.
 
+    The mapping is kept as module buffers, so it can be moved with e.g. `.to(device)`. If it is applied to trials on
+    another device, a copy of the mapping is made (once) for that device.
+
     TODO - refer to eventual literature on this
     """
+    # Each set of channel type indices is contiguous, index with (view producing) slices instead of lists
+    _CH_TYPE_INDS = [slice(inds[0], inds[-1] + 1) if inds == list(range(inds[0], inds[-1] + 1)) else inds
+                     for inds in (EEG_INDS, EOG_INDS, REF_INDS, EXTRA_INDS)]
+
     def __init__(self, dataset, add_scale_ind=True, return_mask=False):
         """
         Creates a Deep10-10 mapping for the provided dataset.
@@ -325,8 +448,24 @@ class MappingDeep1010(InstanceTransform):
                       If `True` (`False` by default), an additional tensor is returned after this transform that
                       says which channels of the mapping are in fact in use.
         """
-        super().__init__()
-        self.mapping = map_dataset_channels_deep_1010(dataset.channels)
+        torch.nn.Module.__init__(self)
+        InstanceTransform.__init__(self)
+        mapping = map_dataset_channels_deep_1010(dataset.channels)
+        # The mapping is very sparse, so remap with its (old channel, new channel, weight) triplets
+        src_idx, dst_idx = mapping.nonzero(as_tuple=True)
+        self.register_buffer('_src_idx', src_idx)
+        self.register_buffer('_dst_idx', dst_idx)
+        self.register_buffer('_weights', mapping[src_idx, dst_idx])
+        # Most often, each new channel is copied from exactly one old one
+        self._copy_only = bool(torch.all(self._weights == 1)) and len(dst_idx.unique()) == len(dst_idx)
+        self.register_buffer('_mask', mapping.sum(dim=0).bool())
+        self.register_buffer('_unused_mask', ~self._mask)
+        # Trials are remapped with the above, so the dense mapping can be stored compactly
+        if torch.all((mapping == 0) | (mapping == 1)):
+            self.register_buffer('mapping', mapping.to(torch.int8))
+        else:
+            self.register_buffer('mapping', mapping.to(torch.float16))
+        self._device_buffers = dict()
         self.max_scale = None
         if add_scale_ind:
             if dataset.info is None or dataset.info.data_max is None or dataset.info.data_min is None:
@@ -336,35 +475,48 @@ class MappingDeep1010(InstanceTransform):
                 self.max_scale = dataset.info.data_max - dataset.info.data_min
         self.return_mask = return_mask
 
+    def _buffers_on(self, device):
+        if device == self._src_idx.device:
+            return self._src_idx, self._dst_idx, self._weights, self._mask, self._unused_mask
+        if device not in self._device_buffers:
+            self._device_buffers[device] = tuple(b.to(device) for b in (self._src_idx, self._dst_idx, self._weights,
+                                                                          self._mask, self._unused_mask))
+        return self._device_buffers[device]
+
     def __call__(self, x):
         if self.max_scale is not None:
             scale = 2 * (torch.clamp_max((x.max() - x.min()) / self.max_scale, 1.0) - 0.5)
         else:
             scale = 0
 
-        x = (x.transpose(1, 0) @ self.mapping).transpose(1, 0)
+        src_idx, dst_idx, weights, mask, unused_mask = self._buffers_on(x.device)
+        x = self._remap(x, src_idx, dst_idx, weights)
 
-        for ch_type_inds in (EEG_INDS, EOG_INDS, REF_INDS, EXTRA_INDS):
+        for ch_type_inds in self._CH_TYPE_INDS:
             x[ch_type_inds, :] = min_max_normalize(x[ch_type_inds, :])
 
-        used_channel_mask = self.mapping.sum(dim=0).bool()
-        x[~used_channel_mask, :] = 0
+        x[unused_mask, :] = 0
 
         x[SCALE_IND, :] = scale
 
         if self.return_mask:
-            return (x, used_channel_mask)
+            return (x, mask)
         else:
             return x
 
+    def _remap(self, x, src_idx, dst_idx, weights):
+        mapped = x.new_zeros((self.mapping.shape[1], x.shape[-1]))
+        if self._copy_only:
+            mapped[dst_idx] = x[src_idx]
+        else:
+            mapped.index_add_(0, dst_idx, x[src_idx] * weights.to(x.dtype).unsqueeze(-1))
+        return mapped
+
     def new_channels(self, old_channels: np.ndarray):
-        channels = list()
-        for row in range(self.mapping.shape[1]):
-            active = self.mapping[:, row].nonzero().numpy()
-            if len(active) > 0:
-                channels.append("-".join([old_channels[i.item(), 0] for i in active]))
-            else:
-                channels.append(None)
+        # Non-zeros of the transpose are ordered by new channel, and then by old channel
+        new_inds, old_inds = self.mapping.t().nonzero(as_tuple=True)
+        groups = torch.split(old_inds, torch.bincount(new_inds, minlength=self.mapping.shape[1]).tolist())
+        channels = ["-".join(old_channels[g.numpy(), 0]) if len(g) > 0 else None for g in groups]
         return np.array(list(zip(channels, DEEP_1010_CH_TYPES)))
 
 
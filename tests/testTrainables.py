@@ -1,12 +1,22 @@
 import mne
+import torch
 import torch.nn as nn
+import torch.distributed as dist
+import torch.multiprocessing as mp
 import unittest
 import io
+import os
+import copy
 import sys
+from contextlib import nullcontext
+from unittest import mock
 
-from torch.utils.data import DataLoader
-from dn3.trainable.processes import StandardClassification
+from torch.utils.data import DataLoader, WeightedRandomSampler
+from torch.nn.parallel import DistributedDataParallel
+from dn3.trainable.processes import StandardClassification, DistributedSamplerWrapper, LDAMLoss, \
+    _configure_cuda_allocator
 from dn3.trainable.models import EEGNetStrided
+from dn3.trainable.layers import DenseSpatialFilter
 from dn3.metrics.base import balanced_accuracy
 from tests.dummy_data import create_dummy_dataset, retrieve_underlying_dummy_data, EVENTS
 
@@ -21,6 +31,76 @@ class DummyClassifier(nn.Module):
         return self.classifier(x.view((x.shape[0], -1)))
 
 
+class BFloat16Classifier(DummyClassifier):
+    """Produces bfloat16 outputs, as the classifier does when training with mixed precision"""
+
+    def forward(self, x):
+        return super().forward(x).bfloat16()
+
+
+class CountingDDP(DistributedDataParallel):
+    """Stands in for a DistributedDataParallel wrapper (without a process group), counting calls to `no_sync()`"""
+
+    def __init__(self, module):
+        nn.Module.__init__(self)
+        self.module = module
+        self.no_sync_calls = 0
+
+    def no_sync(self):
+        self.no_sync_calls += 1
+        return nullcontext()
+
+    def forward(self, *inputs):
+        return self.module(*inputs)
+
+
+class CompiledStandIn(nn.Module):
+    """Mimics the wrapper returned by torch.compile(), which exposes the wrapped module as `_orig_mod`"""
+
+    def __init__(self, module):
+        super().__init__()
+        self._orig_mod = module
+
+    def forward(self, *inputs):
+        return self._orig_mod(*inputs)
+
+
+def _distributed_tensor_gradients(rank, world_size):
+    os.environ.update(MASTER_ADDR='127.0.0.1', MASTER_PORT='29517')
+    dist.init_process_group('gloo', rank=rank, world_size=world_size)
+    try:
+        process = StandardClassification(DummyClassifier(2, 2, 2), cuda=False)
+        # A trainable tensor that (unlike the classifier) DDP cannot wrap, it starts different on every replica
+        process.weighting = torch.full((3,), float(rank + 1), requires_grad=True)
+        process._trainables.append('weighting')
+        process._wrap_distributed()
+        assert torch.all(process.weighting == 1)
+        process.weighting.grad = torch.full((3,), float(rank))
+        process._sync_tensor_gradients()
+        assert torch.allclose(process.weighting.grad, torch.full((3,), (world_size - 1) / 2))
+    finally:
+        dist.destroy_process_group()
+
+
+def _distributed_balanced_sampling(rank, world_size):
+    os.environ.update(MASTER_ADDR='127.0.0.1', MASTER_PORT='29518')
+    dist.init_process_group('gloo', rank=rank, world_size=world_size)
+    try:
+        mne.set_log_level(False)
+        dataset = create_dummy_dataset()
+        process = StandardClassification(DummyClassifier(len(dataset.channels), dataset.sequence_length, 4),
+                                         cuda=False)
+        loader = process._make_dataloader(dataset, training=True, balance_method='oversample')
+        assert isinstance(loader.sampler, DistributedSamplerWrapper)
+        assert isinstance(loader.sampler.sampler, WeightedRandomSampler)
+        assert len(loader.sampler) == len(loader.sampler.sampler) // world_size
+
+        loader = process._make_dataloader(dataset, training=True, balance_method='ldam')
+        assert isinstance(process.loss, LDAMLoss)
+    finally:
+        dist.destroy_process_group()
+
+
 class TestSimpleClassifier(unittest.TestCase):
 
     _NUM_EPOCHS = 10
@@ -83,6 +163,96 @@ class TestSimpleClassifier(unittest.TestCase):
 
         self.assertEqual(len(train_log), self._NUM_EPOCHS * len(self.dataset) // self._BATCH_SIZE)
 
+    def test_AccumulatedFit(self):
+        self._check_accumulated_fit(2)
+
+    def test_AccumulatedFitUneven(self):
+        batches = len(self.dataset) // self._BATCH_SIZE
+        accumulation_steps = 3
+        self.assertNotEqual(batches % accumulation_steps, 0)
+        self._check_accumulated_fit(accumulation_steps)
+
+    def _check_accumulated_fit(self, accumulation_steps):
+        process = StandardClassification(self.classifier)
+        loader = DataLoader(self.dataset, batch_size=self._BATCH_SIZE, shuffle=True, num_workers=self._NUM_WORKERS,
+                            drop_last=True)
+        num_batches = len(loader)
+        steps_per_epoch = -(-num_batches // accumulation_steps)
+        calls = dict(step=0, zero_grad=0, batches=0)
+
+        def expected_steps(batches):
+            # Groups of batches restart every epoch
+            epochs, batches = divmod(batches, num_batches)
+            return epochs * steps_per_epoch + batches // accumulation_steps
+
+        class CountingSGD(torch.optim.SGD):
+            def step(self, *args, **kwargs):
+                calls['step'] += 1
+                return super().step(*args, **kwargs)
+
+            def zero_grad(self, *args, **kwargs):
+                calls['zero_grad'] += 1
+                return super().zero_grad(*args, **kwargs)
+
+        process.set_optimizer(CountingSGD(process.parameters(), lr=process.lr, momentum=0.9))
+
+        def checks(metrics):
+            calls['batches'] += 1
+            steps = expected_steps(calls['batches'])
+            with self.subTest("optimizer-steps"):
+                self.assertEqual(calls['step'], steps)
+            with self.subTest("scheduler-steps"):
+                self.assertEqual(process.scheduler.last_epoch, steps)
+            with self.subTest("gradients-cleared-once-per-step"):
+                self.assertEqual(calls['zero_grad'], expected_steps(calls['batches'] - 1) + 1)
+            if steps == expected_steps(calls['batches'] - 1):
+                with self.subTest("gradients-kept-mid-accumulation"):
+                    self.assertTrue(all(p.grad is not None for p in process.parameters()))
+            if calls['batches'] == self._NUM_EPOCHS * num_batches:
+                with self.subTest("schedule-completed"):
+                    self.assertLess(metrics['lr'], process.lr * 1e-4)
+
+        train_log, eval_log = process.fit(loader, epochs=self._NUM_EPOCHS, step_callback=checks,
+                                          accumulation_steps=accumulation_steps)
+
+        self.assertEqual(len(train_log), self._NUM_EPOCHS * num_batches)
+        self.assertEqual(calls['step'], self._NUM_EPOCHS * steps_per_epoch)
+
+    def test_AccumulatedFitCompiledDDPNoSync(self):
+        process = StandardClassification(self.classifier, compile_classifier=False)
+        ddp = CountingDDP(self.classifier)
+        process.classifier = CompiledStandIn(ddp)
+        loader = DataLoader(self.dataset, batch_size=self._BATCH_SIZE, shuffle=True, num_workers=self._NUM_WORKERS,
+                            drop_last=True)
+        train_log, eval_log = process.fit(loader, epochs=self._NUM_EPOCHS, accumulation_steps=2)
+
+        # Every batch but the last of each accumulation window skips the all-reduce
+        self.assertEqual(ddp.no_sync_calls, len(train_log) - len(train_log) // 2)
+
+    def test_CudaAllocatorConfig(self):
+        with mock.patch.dict(os.environ):
+            os.environ.pop("PYTORCH_CUDA_ALLOC_CONF", None)
+            with mock.patch('torch.cuda.is_initialized', return_value=True), self.assertWarns(UserWarning):
+                _configure_cuda_allocator("expandable_segments:True")
+            self.assertNotIn("PYTORCH_CUDA_ALLOC_CONF", os.environ)
+            with mock.patch('torch.cuda.is_initialized', return_value=False):
+                _configure_cuda_allocator("expandable_segments:True")
+            self.assertEqual(os.environ["PYTORCH_CUDA_ALLOC_CONF"], "expandable_segments:True")
+
+    def test_ReducedPrecisionTrainingMetrics(self):
+        classifier = BFloat16Classifier(len(self.dataset.channels), self.dataset.sequence_length, 4)
+        process = StandardClassification(classifier, metrics=dict(BAC=balanced_accuracy))
+        loader = DataLoader(self.dataset, batch_size=self._BATCH_SIZE, num_workers=self._NUM_WORKERS)
+        train_metrics = process.train_step(*next(iter(loader)))
+        self.assertIn('BAC', train_metrics)
+        self.assertIn('Accuracy', train_metrics)
+
+    def test_SlowDataLoaderWarning(self):
+        process = StandardClassification(self.classifier)
+        loader = DataLoader(self.dataset, batch_size=self._BATCH_SIZE, num_workers=1, prefetch_factor=2)
+        with self.assertWarns(UserWarning):
+            process._check_dataloader(loader)
+
     def test_EvaluationMetrics(self):
         trainable = StandardClassification(self.classifier, metrics=dict(BAC=balanced_accuracy))
         val_metrics = trainable.evaluate(self.dataset)
@@ -90,6 +260,61 @@ class TestSimpleClassifier(unittest.TestCase):
         self.assertIn('loss', val_metrics)
 
 
+class TestLayers(unittest.TestCase):
+
+    def test_MemoryEfficientDenseSpatialFilter(self):
+        torch.manual_seed(0)
+        # Double precision, so that only actual differences (not rounding) are caught
+        default = DenseSpatialFilter(8, 4, 3).double()
+        efficient = copy.deepcopy(default)
+        efficient.memory_efficient = True
+        x = torch.randn(5, 8, 30, dtype=torch.float64, requires_grad=True)
+        x_efficient = x.detach().clone().requires_grad_()
+
+        out = default(x)
+        out_efficient = efficient(x_efficient)
+        out.square().sum().backward()
+        out_efficient.square().sum().backward()
+
+        with self.subTest("output"):
+            self.assertTrue(torch.allclose(out, out_efficient))
+        with self.subTest("input-gradients"):
+            self.assertTrue(torch.allclose(x.grad, x_efficient.grad))
+        with self.subTest("batch-norm-statistics"):
+            for (name, buffer), buffer_efficient in zip(default.named_buffers(), efficient.buffers()):
+                self.assertTrue(torch.allclose(buffer, buffer_efficient), name)
+
+
+@unittest.skipUnless(dist.is_available(), "torch.distributed is unavailable")
+class TestDistributed(unittest.TestCase):
+
+    _WORLD_SIZE = 2
+
+    def test_TensorGradientsAveraged(self):
+        mp.spawn(_distributed_tensor_gradients, args=(self._WORLD_SIZE,), nprocs=self._WORLD_SIZE)
+
+    def test_BalancedSamplingDistributed(self):
+        mp.spawn(_distributed_balanced_sampling, args=(self._WORLD_SIZE,), nprocs=self._WORLD_SIZE)
+
+    def test_DistributedSamplerWrapper(self):
+        sampler = WeightedRandomSampler(torch.rand(50), 25)
+        shards = [DistributedSamplerWrapper(sampler, num_replicas=self._WORLD_SIZE, rank=r)
+                  for r in range(self._WORLD_SIZE)]
+        whole = DistributedSamplerWrapper(sampler, num_replicas=1, rank=0)
+        for epoch in range(2):
+            for s in shards + [whole]:
+                s.set_epoch(epoch)
+            drawn = [list(s) for s in shards]
+            expected = list(whole)
+            with self.subTest("same-draw", epoch=epoch):
+                self.assertEqual(drawn[0], expected[0::2])
+                # Padded with the first index so that each process has the same number
+                self.assertEqual(drawn[1], expected[1::2] + expected[:1])
+        with self.subTest("new-draw-each-epoch"):
+            whole.set_epoch(0)
+            self.assertNotEqual(list(whole), expected)
+
+
 if __name__ == '__main__':
     unittest.main()
 
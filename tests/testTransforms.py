@@ -7,7 +7,8 @@ from dn3.utils import min_max_normalize
 from dn3.transforms.channels import DEEP_1010_CHS_LISTING, stringify_channel_mapping
 from tests.dummy_data import create_dummy_dataset, retrieve_underlying_dummy_data, EVENTS, check_epoch_against_data
 
-from dn3.transforms.instance import ZScore, MappingDeep1010, TemporalInterpolation
+from dn3.transforms.instance import ZScore, MappingDeep1010, TemporalInterpolation, TemporalPadding, \
+    CompiledTransformPipeline
 
 def simple_zscoring(data: torch.Tensor):
     return (data - data.mean()) / data.std()
@@ -73,6 +74,37 @@ class TestInstanceTransforms(unittest.TestCase):
                 # nearest should mean that values are just dumplicated and we can slice to get original
                 self.assertTrue(torch.allclose(x[:, slice(0, x.shape[1], 2)], _check_zscored_trial(ev_id)))
 
+    def test_TemporalPadding(self):
+        start, end = 3, 5
+        transform = TemporalPadding(start, end)
+        self.dataset.add_transform(transform)
+
+        with self.subTest(i="initialization"):
+            self.assertEqual(self.dataset.sequence_length, retrieve_underlying_dummy_data(0).shape[-1] + start + end)
+
+        i = 0
+        for x, y in self.dataset:
+            i += 1
+            with self.subTest(i=i):
+                ev_id = (i - 1) % len(EVENTS)
+                self.assertEqual(x.shape[-1], self.dataset.sequence_length)
+                self.assertTrue(torch.all(x[:, :start] == 0) and torch.all(x[:, -end:] == 0))
+                self.assertTrue(torch.allclose(x[:, start:-end], _check_zscored_trial(ev_id)))
+
+    def test_CompiledTransforms(self):
+        self.dataset.add_transform(TemporalPadding(3, 5))
+        expected = [x for x, y in self.dataset]
+        self.dataset.compile_transforms()
+
+        with self.subTest(i="collapsed"):
+            self.assertEqual(len(self.dataset._transforms), 1)
+            self.assertIsInstance(self.dataset._transforms[0], CompiledTransformPipeline)
+            self.assertEqual(self.dataset.sequence_length, expected[0].shape[-1])
+
+        for i, (x, y) in enumerate(self.dataset):
+            with self.subTest(i=i):
+                self.assertTrue(torch.allclose(x, expected[i], atol=1e-6))
+
     def test_MapDeep1010Channels(self):
         transform = MappingDeep1010(self.dataset)
         self.dataset.add_transform(transform)